@@ -2,22 +2,67 @@
 时序异常检测模块（核心功能⭐⭐⭐⭐⭐）
 """
 import numpy as np
-from typing import List, Dict
+from typing import List, Dict, Tuple
 from datetime import datetime, timedelta
 
+from backend.utils.cache import cached_analysis
+
+# 可选依赖：numba（未安装时窗口统计以纯 Python 循环执行）
+try:
+    from numba import njit  # type: ignore
+except Exception:
+    njit = None  # type: ignore
+
+
+def _jit(func):
+    return njit(cache=True, fastmath=True)(func) if njit is not None else func
+
+
+@_jit
+def _window_kernel(emotion, interaction, post, hour, emotion_mean, emotion_std):
+    """一次循环求出最近 7 天的 z 分数及各项计数，以及前一窗口的互动总数。"""
+    n = emotion.shape[0]
+    start = n - 7
+    z_scores = np.empty(7, dtype=np.float64)
+    anomaly_days = 0
+    emotion_sum = 0.0
+    posts = 0
+    interactions = 0
+    late_night = 0
+    for k in range(7):
+        i = start + k
+        z = (emotion[i] - emotion_mean) / emotion_std
+        z_scores[k] = z
+        if z < -2:
+            anomaly_days += 1
+        emotion_sum += emotion[i]
+        posts += post[i]
+        interactions += interaction[i]
+        if hour[i] >= 22 or hour[i] < 6:
+            late_night += 1
+    prev_start = n - 14 if n >= 14 else 0
+    prev_interactions = 0
+    for i in range(prev_start, prev_start + 7):
+        prev_interactions += interaction[i]
+    return z_scores, anomaly_days, emotion_sum / 7, posts, interactions, late_night, prev_interactions
+
+
 class AnomalyDetector:
     def __init__(self):
         self.user_baselines = {}
 
+    @cached_analysis('anomaly')
     def detect(self, user_id: str, days: int = 30) -> Dict:
         data = self._fetch_user_data(user_id, days)
         if len(data) < 7:
             return {'user_id': user_id,'is_anomaly': False,'message': '数据不足'}
-        baseline = self._build_baseline(user_id, data)
-        emotion_anomaly = self._detect_emotion_change(data, baseline)
-        behavior_anomaly = self._detect_behavior_change(data, baseline)
-        sleep_anomaly = self._detect_sleep_pattern_change(data, baseline)
-        social_anomaly = self._detect_social_withdrawal(data, baseline)
+        emotion, interaction, post, hour = self._to_arrays(data)
+        baseline = self._build_baseline(user_id, emotion, interaction)
+        window = self._window_stats(emotion, interaction, post, hour, baseline)
+        emotion_anomaly = self._detect_emotion_change(window, baseline)
+        behavior_anomaly = self._detect_behavior_change(window, baseline)
+        sleep_anomaly = self._detect_sleep_pattern_change(window, baseline)
+        social_anomaly = self._detect_social_withdrawal(window, baseline)
         score = self._calculate_anomaly_score(emotion_anomaly, behavior_anomaly, sleep_anomaly, social_anomaly)
         risk_factors = self._identify_risk_factors(emotion_anomaly, behavior_anomaly, sleep_anomaly, social_anomaly)
         intervention = self._generate_intervention_suggestion(score, risk_factors)
@@ -35,60 +80,64 @@ class AnomalyDetector:
             'analysis_timestamp': datetime.now().isoformat()
         }
 
-    def _build_baseline(self, user_id: str, data: List[Dict]) -> Dict:
-        subset = data[:int(len(data)*0.7)]
-        emotion_scores = [d['emotion_score'] for d in subset]
-        interaction_counts = [d['interaction_count'] for d in subset]
+    def _to_arrays(self, data: List[Dict]) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """按列展开逐日记录（AoS→SoA），后续检测均复用这些数组。"""
+        n = len(data)
+        emotion = np.fromiter((d['emotion_score'] for d in data), dtype=np.float32, count=n)
+        interaction = np.fromiter((d['interaction_count'] for d in data), dtype=np.int64, count=n)
+        post = np.fromiter((d['post_count'] for d in data), dtype=np.int64, count=n)
+        hour = np.fromiter((d['activity_hour'] for d in data), dtype=np.int8, count=n)
+        return emotion, interaction, post, hour
+
+    def _build_baseline(self, user_id: str, emotion: np.ndarray, interaction: np.ndarray) -> Dict:
+        split = int(len(emotion)*0.7)
         baseline = {
-            'emotion_mean': np.mean(emotion_scores),
-            'emotion_std': np.std(emotion_scores) or 1,
-            'interaction_mean': np.mean(interaction_counts),
-            'interaction_std': np.std(interaction_counts) or 1
+            'emotion_mean': float(emotion[:split].mean()),
+            'emotion_std': float(emotion[:split].std()) or 1,
+            'interaction_mean': float(interaction[:split].mean()),
+            'interaction_std': float(interaction[:split].std()) or 1
         }
         self.user_baselines[user_id] = baseline
         return baseline
 
-    def _detect_emotion_change(self, data: List[Dict], baseline: Dict) -> Dict:
-        recent = data[-7:]
-        scores = [d['emotion_score'] for d in recent]
-        z_scores = [(s - baseline['emotion_mean'])/baseline['emotion_std'] for s in scores]
-        anomaly_days = sum(1 for z in z_scores if z < -2)
+    def _window_stats(self, emotion: np.ndarray, interaction: np.ndarray, post: np.ndarray, hour: np.ndarray, baseline: Dict) -> Dict:
+        z_scores, anomaly_days, recent_avg, posts, interactions, late_night, prev_interactions = _window_kernel(
+            emotion, interaction, post, hour, baseline['emotion_mean'], baseline['emotion_std'])
+        return {'z_scores': z_scores,'anomaly_days': int(anomaly_days),'recent_avg': float(recent_avg),'recent_posts': int(posts),
+                'recent_interactions': int(interactions),'late_night_count': int(late_night),'previous_interactions': int(prev_interactions),'size': 7}
+
+    def _detect_emotion_change(self, window: Dict, baseline: Dict) -> Dict:
+        anomaly_days = window['anomaly_days']
         is_anomaly = anomaly_days >= 3
-        recent_avg = np.mean(scores)
+        recent_avg = window['recent_avg']
         change_rate = (recent_avg - baseline['emotion_mean'])/baseline['emotion_mean'] if baseline['emotion_mean'] else 0
-        return {'detected': is_anomaly,'z_scores': z_scores,'anomaly_days': anomaly_days,'recent_avg': recent_avg,'baseline_avg': baseline['emotion_mean'],'change_rate': round(change_rate,3)}
+        return {'detected': is_anomaly,'z_scores': window['z_scores'].tolist(),'anomaly_days': anomaly_days,'recent_avg': recent_avg,'baseline_avg': baseline['emotion_mean'],'change_rate': round(change_rate,3)}
 
-    def _detect_behavior_change(self, data: List[Dict], baseline: Dict) -> Dict:
-        recent = data[-7:]
-        posts = sum(d['post_count'] for d in recent)
+    def _detect_behavior_change(self, window: Dict, baseline: Dict) -> Dict:
+        posts = window['recent_posts']
         baseline_posts = 10
         post_change = (posts - baseline_posts)/baseline_posts if baseline_posts else 0
-        interactions = [d['interaction_count'] for d in recent]
-        interaction_avg = np.mean(interactions)
+        interaction_avg = window['recent_interactions']/window['size']
         interaction_change = (interaction_avg - baseline['interaction_mean'])/baseline['interaction_mean'] if baseline['interaction_mean'] else 0
         is_anomaly = post_change < -0.5 or interaction_change < -0.5
         return {'detected': is_anomaly,'post_change_rate': round(post_change,3),'interaction_change_rate': round(interaction_change,3),'recent_posts': posts,'baseline_posts': baseline_posts}
 
-    def _detect_sleep_pattern_change(self, data: List[Dict], baseline: Dict) -> Dict:
-        recent = data[-7:]
-        late_night = sum(1 for d in recent if d['activity_hour']>=22 or d['activity_hour']<6)
-        ratio = late_night/len(recent)
+    def _detect_sleep_pattern_change(self, window: Dict, baseline: Dict) -> Dict:
+        late_night = window['late_night_count']
+        ratio = late_night/window['size']
         return {'detected': ratio>0.5,'late_night_count': late_night,'late_night_ratio': round(ratio,3),'insomnia_risk': ratio>0.6}
 
-    def _detect_social_withdrawal(self, data: List[Dict], baseline: Dict) -> Dict:
-        recent = data[-7:]
-        prev = data[-14:-7] if len(data)>=14 else data[:7]
-        recent_interactions = sum(d['interaction_count'] for d in recent)
-        prev_interactions = sum(d['interaction_count'] for d in prev)
+    def _detect_social_withdrawal(self, window: Dict, baseline: Dict) -> Dict:
+        recent_interactions = window['recent_interactions']
+        prev_interactions = window['previous_interactions']
         change_rate = (recent_interactions - prev_interactions)/prev_interactions if prev_interactions else 0
         return {'detected': change_rate < -0.6,'recent_interactions': recent_interactions,'previous_interactions': prev_interactions,'change_rate': round(change_rate,3)}
 
     def _calculate_anomaly_score(self, emotion, behavior, sleep, social) -> float:
-        score = 0.0
-        if emotion['detected']: score += 35 * abs(emotion['change_rate'])
-        if behavior['detected']: score += 25
-        if sleep['detected']: score += 20 * sleep['late_night_ratio']
-        if social['detected']: score += 20 * abs(social['change_rate'])
+        score = (35 * abs(emotion['change_rate']) * emotion['detected']
+                 + 25 * behavior['detected']
+                 + 20 * sleep['late_night_ratio'] * sleep['detected']
+                 + 20 * abs(social['change_rate']) * social['detected'])
         return round(min(score,100),2)
 
     def _identify_risk_factors(self, emotion, behavior, sleep, social) -> List[str]:
@@ -110,11 +159,13 @@ class AnomalyDetector:
         return '🔴 高风险'
 
     def _fetch_user_data(self, user_id: str, days: int) -> List[Dict]:
-        data = []
+        rng = np.random.default_rng()
+        i = np.arange(days)
+        emotion = np.clip(70 - i*1.5 + rng.normal(0,5,days), 0, 100)
+        hours = rng.choice([2,14,20,22,23,1], size=days)
+        posts = np.maximum(0, np.trunc(5 - i*0.1 + rng.normal(0,2,days))).astype(int)
+        interactions = np.maximum(0, np.trunc(20 - i*0.3 + rng.normal(0,5,days))).astype(int)
+        valence = -0.3 - i*0.01 + rng.normal(0,0.1,days)
         base_date = datetime.now() - timedelta(days=days)
-        for i in range(days):
-            date = base_date + timedelta(days=i)
-            emotion_score = 70 - i * 1.5 + np.random.normal(0,5)
-            emotion_score = max(0,min(100,emotion_score))
-            data.append({'date': date.isoformat(),'emotion_score': emotion_score,'activity_hour': np.random.choice([2,14,20,22,23,1]),'post_count': max(0,int(5 - i*0.1 + np.random.normal(0,2))),'interaction_count': max(0,int(20 - i*0.3 + np.random.normal(0,5))),'music_valence': -0.3 - i*0.01 + np.random.normal(0,0.1)})
-        return data
+        return [{'date': (base_date + timedelta(days=d)).isoformat(),'emotion_score': e,'activity_hour': h,'post_count': p,'interaction_count': c,'music_valence': v}
+                for d, e, h, p, c, v in zip(range(days), emotion.tolist(), hours.tolist(), posts.tolist(), interactions.tolist(), valence.tolist())]
@@ -4,35 +4,247 @@ BERT情感分析模块（核心AI模块⭐⭐⭐⭐⭐）
 
 import torch
 import torch.nn as nn
-from transformers import BertTokenizer, BertForSequenceClassification
+from transformers import AutoTokenizer, AutoModelForSequenceClassification
 from typing import List, Dict
 import numpy as np
-import json
 import os
+import re
+import hashlib
+import inspect
+import shutil
+import tempfile
+import orjson
+from pathlib import Path
+from functools import lru_cache
 from datetime import datetime
 
+from backend.models import database
+from backend.utils.helpers import cpu_share
+
+# 可选依赖：ONNX Runtime（CPU 上以 INT8 量化的 ONNX 模型推理；未安装时使用 PyTorch）
+try:
+    import onnxruntime as ort  # type: ignore
+    from onnxruntime.quantization import quantize_dynamic, QuantType  # type: ignore
+except Exception:
+    ort = None  # type: ignore
+
+ONNX_MODEL_PATH = os.getenv('EMOTION_ONNX_PATH', 'ai-models/emotion_bert.onnx')
+# 可指向离线蒸馏得到的 4 层学生模型（TinyBERT/DistilBERT 等，6 类情绪头），按 config 自动选择结构
+DEFAULT_MODEL = os.getenv('MODEL_PATH', 'hfl/chinese-bert-wwm-ext')
+# 预过滤：短于该长度且不含风险词/网络用语的文本直接判为中性，不进入 BERT
+PREFILTER_MAX_LEN = 20
+# 分词结果（int32 token id）在 Redis 中的缓存时间
+TOKEN_CACHE_TTL = 24 * 3600
+
+
+def configure_torch_threads() -> None:
+    """算子内并行使用本 worker 分到的物理核心数，算子间并行设为 1（需在首次推理前调用）。"""
+    try:
+        import psutil  # type: ignore
+        cores = psutil.cpu_count(logical=False)
+    except Exception:
+        cores = None
+    torch.set_num_threads(cpu_share(cores))
+    try:
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        # 已有并行任务运行后不允许再修改
+        pass
+
+
+@lru_cache(maxsize=None)
+def _load_tokenizer(model_name: str):
+    return AutoTokenizer.from_pretrained(model_name, use_fast=True)
+
+
+@lru_cache(maxsize=None)
+def _vocab_digest(model_name: str) -> str:
+    """词表摘要：词表相同的模型（如蒸馏前后）共享分词缓存。"""
+    vocab = sorted(_load_tokenizer(model_name).get_vocab().items())
+    return hashlib.blake2b(orjson.dumps(vocab), digest_size=8).hexdigest()
+
+
+@lru_cache(maxsize=None)
+def _load_model(model_name: str, device_type: str):
+    """按 (模型名, 设备) 缓存模型，进程内只加载一次。"""
+    model = AutoModelForSequenceClassification.from_pretrained(model_name, num_labels=6).to(device_type)
+    model.eval()
+    if device_type == 'cuda':
+        model.half()
+        if hasattr(torch, 'compile'):
+            # 微批的 (batch, seq_len) 每次都不同：按动态形状编译一次，不用 CUDA Graph（每个形状都要重新捕获）
+            model = torch.compile(model, dynamic=True)
+    else:
+        # CPU 推理受限于权重带宽：线性层动态量化为 int8
+        model = torch.quantization.quantize_dynamic(model, {nn.Linear}, dtype=torch.qint8)
+    return model
+
+
+def _quantized_onnx_path(model_name: str, onnx_path: str) -> str:
+    """量化模型文件名带模型名摘要，更换 MODEL_PATH 后不会误用旧模型导出的文件。"""
+    digest = hashlib.blake2b(model_name.encode(), digest_size=6).hexdigest()
+    base = onnx_path[:-len('.onnx')] if onnx_path.endswith('.onnx') else onnx_path
+    return f"{base}.{digest}.int8.onnx"
+
+
+def _export_quantized_onnx(model_name: str, quantized_path: str) -> None:
+    """导出并量化到临时目录，完成后原子替换到目标路径，避免多进程读到写了一半的文件。"""
+    target_dir = os.path.dirname(quantized_path) or '.'
+    os.makedirs(target_dir, exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(dir=target_dir, prefix='.onnx-export-')
+    try:
+        model = AutoModelForSequenceClassification.from_pretrained(model_name, num_labels=6).eval()
+        dummy = _load_tokenizer(model_name)(['预热'], return_tensors='pt')
+        # 位置参数须与 forward 的形参顺序一致（BERT 为 input_ids, attention_mask, token_type_ids）；
+        # 不接受 token_type_ids 的结构（如 DistilBERT）分词结果中本就没有该项
+        names = [n for n in inspect.signature(model.forward).parameters if n in dummy]
+        axes = {name: {0: 'batch', 1: 'sequence'} for name in names}
+        axes['logits'] = {0: 'batch'}
+        fp32_path = os.path.join(tmp_dir, 'model.onnx')
+        int8_path = os.path.join(tmp_dir, 'model.int8.onnx')
+        torch.onnx.export(model, tuple(dummy[n] for n in names), fp32_path, input_names=names, output_names=['logits'],
+                          dynamic_axes=axes, opset_version=17, dynamo=False)
+        quantize_dynamic(fp32_path, int8_path, weight_type=QuantType.QInt8)
+        os.replace(int8_path, quantized_path)
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+@lru_cache(maxsize=None)
+def _load_onnx_session(model_name: str, onnx_path: str = ONNX_MODEL_PATH):
+    """
+    加载 INT8 量化的 ONNX 推理会话；首次运行时从 PyTorch 模型导出并量化。
+    ONNX Runtime 不可用或导出失败时返回 None，由调用方回退到 PyTorch。
+    """
+    if ort is None:
+        return None
+    quantized_path = _quantized_onnx_path(model_name, onnx_path)
+    try:
+        if not os.path.exists(quantized_path):
+            _export_quantized_onnx(model_name, quantized_path)
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = cpu_share()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        return ort.InferenceSession(quantized_path, sess_options=options, providers=['CPUExecutionProvider'])
+    except Exception as e:
+        print(f"⚠️ ONNX 模型加载失败，回退到 PyTorch: {e}")
+        return None
+
+
+@lru_cache(maxsize=None)
+def _read_slang_file(slang_file: str) -> Dict[str, str]:
+    """解析网络用语映射表，进程内只读一次文件。"""
+    if os.path.exists(slang_file):
+        try:
+            data = orjson.loads(Path(slang_file).read_bytes())
+            mapping = {}
+            for section in data.values():
+                if isinstance(section, dict):
+                    for k,v in section.get('standard_mapping', {}).items():
+                        mapping[k] = v
+            return mapping
+        except Exception:
+            pass
+    return {'emo了': '情绪低落','破防了': '心理防线崩溃','麻了': '麻木','摆烂': '自暴自弃','躺平': '放弃努力'}
+
+
 class EmotionAnalyzer:
     def __init__(self, model_path: str = None):
         self.device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
-        model_name = model_path or 'hfl/chinese-bert-wwm-ext'
-        self.tokenizer = BertTokenizer.from_pretrained(model_name)
-        self.emotion_model = BertForSequenceClassification.from_pretrained(model_name, num_labels=6).to(self.device)
+        model_name = model_path or DEFAULT_MODEL
+        self.model_name = model_name
+        self.tokenizer = _load_tokenizer(model_name)
+        self._token_prefix = f"tok:{_vocab_digest(model_name)}:"
+        self.onnx_session = _load_onnx_session(model_name) if self.device.type == 'cpu' else None
+        self.emotion_model = None if self.onnx_session is not None else _load_model(model_name, self.device.type)
         self.slang_dict = self._load_slang_dict()
+        # 长词优先，避免被其中的短词抢先匹配
+        self._slang_re = re.compile('|'.join(map(re.escape, sorted(self.slang_dict, key=len, reverse=True)))) if self.slang_dict else None
+        self.high_risk_keywords = ['自杀','想死','不想活','结束生命','解脱','抑郁','焦虑','崩溃','绝望','痛苦','失眠','孤独']
+        self._keyword_re = re.compile('|'.join(map(re.escape, self.high_risk_keywords)))
+        self._punct_re = [(re.compile(r'[!！]{2,}'), '！'), (re.compile(r'[?？]{2,}'), '？'), (re.compile(r'[.。]{2,}'), '。')]
         self.emotion_labels = {0: 'positive',1: 'negative',2: 'neutral',3: 'depression',4: 'anxiety',5: 'suicidal'}
         self.risk_weights = {'positive': -10,'negative': 10,'neutral': 0,'depression': 30,'anxiety': 25,'suicidal': 50}
+        neutral_idx = next(i for i, label in self.emotion_labels.items() if label == 'neutral')
+        self._neutral_row = [float(i == neutral_idx) for i in range(len(self.emotion_labels))] + [float(neutral_idx), 0.0]
+        self._risk_weight_vec = torch.tensor([float(self.risk_weights[self.emotion_labels[i]]) for i in range(len(self.emotion_labels))], device=self.device)
 
     def analyze(self, text: str) -> Dict:
-        processed_text = self._preprocess_text(text)
-        inputs = self.tokenizer(processed_text, return_tensors='pt', padding=True, truncation=True, max_length=512).to(self.device)
-        with torch.no_grad():
-            outputs = self.emotion_model(**inputs)
-            logits = outputs.logits
-            probs = torch.softmax(logits, dim=-1)[0]
-        emotions = {label: float(probs[idx]) for idx, label in self.emotion_labels.items()}
-        primary_emotion_idx = torch.argmax(probs).item()
+        return self.batch_analyze([text])[0]
+
+    def batch_analyze(self, texts: List[str]) -> List[Dict]:
+        if not texts:
+            return []
+        processed_texts = [self._preprocess_text(t) for t in texts]
+        rows = [self._neutral_row] * len(texts)
+        heavy = [i for i, t in enumerate(texts) if self._needs_model(t)]
+        if heavy:
+            with torch.inference_mode():
+                logits = self._forward([processed_texts[i] for i in heavy])
+                probs = torch.softmax(logits.float(), dim=-1)
+                primary = probs.argmax(dim=-1, keepdim=True).float()
+                risk = self._calculate_risk_score(probs)
+                # 合并为 [B, 8] 后一次性拷回 CPU
+                for i, row in zip(heavy, torch.cat([probs, primary, risk], dim=-1).cpu().tolist()):
+                    rows[i] = row
+        return [self._build_result(text, processed, row) for text, processed, row in zip(texts, processed_texts, rows)]
+
+    def _needs_model(self, text: str) -> bool:
+        if len(text) >= PREFILTER_MAX_LEN or self._keyword_re.search(text):
+            return True
+        return self._slang_re is not None and self._slang_re.search(text) is not None
+
+    def _forward(self, processed_texts: List[str]) -> torch.Tensor:
+        inputs = self._tokenize(processed_texts)
+        if self.onnx_session is not None:
+            feed = {i.name: inputs[i.name] for i in self.onnx_session.get_inputs()}
+            return torch.from_numpy(self.onnx_session.run(None, feed)[0])
+        inputs = {k: torch.from_numpy(v) for k, v in inputs.items()}
+        if self.device.type == 'cuda':
+            # 锁页内存 + 异步拷贝；autocast 让张量核心执行 FP16 GEMM
+            inputs = {k: v.pin_memory().to(self.device, non_blocking=True) for k, v in inputs.items()}
+            with torch.autocast('cuda', dtype=torch.float16):
+                return self.emotion_model(**inputs).logits
+        return self.emotion_model(**inputs).logits
+
+    def _tokenize(self, texts: List[str]) -> Dict[str, np.ndarray]:
+        """分词并补齐为 int64 批次；每条文本的 token id 按内容摘要缓存在 Redis 中。"""
+        client = database.redis_binary_client
+        if client is None:
+            return dict(self.tokenizer(texts, return_tensors='np', padding=True, truncation=True, max_length=512))
+        keys = [self._token_prefix + hashlib.blake2b(t.encode(), digest_size=16).hexdigest() for t in texts]
+        try:
+            cached = client.mget(keys)
+        except Exception:
+            cached = [None] * len(keys)
+        ids = [np.frombuffer(raw, dtype=np.int32) if raw else None for raw in cached]
+        missing = [i for i, seq in enumerate(ids) if seq is None]
+        if missing:
+            encoded = self.tokenizer([texts[i] for i in missing], truncation=True, max_length=512)['input_ids']
+            pipe = client.pipeline(transaction=False)
+            for i, seq in zip(missing, encoded):
+                ids[i] = np.asarray(seq, dtype=np.int32)
+                pipe.setex(keys[i], TOKEN_CACHE_TTL, ids[i].tobytes())
+            try:
+                pipe.execute()
+            except Exception:
+                pass
+        lengths = np.fromiter(map(len, ids), dtype=np.int64, count=len(ids))
+        input_ids = np.full((len(ids), lengths.max()), self.tokenizer.pad_token_id, dtype=np.int64)
+        for row, seq in zip(input_ids, ids):
+            row[:len(seq)] = seq
+        attention_mask = (np.arange(lengths.max()) < lengths[:, None]).astype(np.int64)
+        batch = {'input_ids': input_ids, 'token_type_ids': np.zeros_like(input_ids), 'attention_mask': attention_mask}
+        # 只给模型实际接受的输入（DistilBERT 等没有 token_type_ids）
+        return {k: v for k, v in batch.items() if k in self.tokenizer.model_input_names}
+
+    def _build_result(self, text: str, processed_text: str, row: List[float]) -> Dict:
+        n = len(self.emotion_labels)
+        emotions = {label: row[idx] for idx, label in self.emotion_labels.items()}
+        primary_emotion_idx = int(row[n])
         primary_emotion = self.emotion_labels[primary_emotion_idx]
-        confidence = float(probs[primary_emotion_idx])
-        risk_score = self._calculate_risk_score(emotions)
+        confidence = row[primary_emotion_idx]
+        risk_score = round(row[n+1], 2)
         keywords = self._extract_keywords(text)
         suggestion = self._generate_suggestion(primary_emotion, risk_score)
         return {
@@ -48,25 +260,17 @@ class EmotionAnalyzer:
             'timestamp': datetime.now().isoformat()
         }
 
-    def batch_analyze(self, texts: List[str]) -> List[Dict]:
-        return [self.analyze(t) for t in texts]
-
     def _preprocess_text(self, text: str) -> str:
         processed = text
-        for slang, standard in self.slang_dict.items():
-            processed = processed.replace(slang, standard)
-        import re
-        processed = re.sub(r'[!！]{2,}', '！', processed)
-        processed = re.sub(r'[?？]{2,}', '？', processed)
-        processed = re.sub(r'[.。]{2,}', '。', processed)
+        if self._slang_re is not None:
+            processed = self._slang_re.sub(lambda m: self.slang_dict[m.group(0)], processed)
+        for pattern, repl in self._punct_re:
+            processed = pattern.sub(repl, processed)
         return processed
 
-    def _calculate_risk_score(self, emotions: Dict[str, float]) -> float:
-        score = 0.0
-        for emotion, prob in emotions.items():
-            score += prob * self.risk_weights.get(emotion, 0)
-        score = max(0, min(100, score))
-        return round(score, 2)
+    def _calculate_risk_score(self, probs: torch.Tensor) -> torch.Tensor:
+        """probs: [B, 6] → [B, 1]，按情绪风险权重加权求和并截断到 0~100。"""
+        return (probs * self._risk_weight_vec).sum(dim=-1, keepdim=True).clamp(0, 100)
 
     def _get_risk_level(self, risk_score: float) -> str:
         if risk_score < 30:
@@ -77,8 +281,8 @@ class EmotionAnalyzer:
             return '🔴 高风险'
 
     def _extract_keywords(self, text: str) -> List[str]:
-        high_risk_keywords = ['自杀','想死','不想活','结束生命','解脱','抑郁','焦虑','崩溃','绝望','痛苦','失眠','孤独']
-        return [k for k in high_risk_keywords if k in text]
+        found = set(self._keyword_re.findall(text))
+        return [k for k in self.high_risk_keywords if k in found]
 
     def _generate_suggestion(self, emotion: str, risk_score: float) -> str:
         if risk_score < 30:
@@ -89,17 +293,4 @@ class EmotionAnalyzer:
             return '高风险警示：建议立即寻求家人、朋友陪伴并联系专业心理咨询师。'
 
     def _load_slang_dict(self) -> Dict[str, str]:
-        slang_file = 'data/teen_slang.json'
-        if os.path.exists(slang_file):
-            try:
-                with open(slang_file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    mapping = {}
-                    for section in data.values():
-                        if isinstance(section, dict):
-                            for k,v in section.get('standard_mapping', {}).items():
-                                mapping[k] = v
-                    return mapping
-            except Exception:
-                pass
-        return {'emo了': '情绪低落','破防了': '心理防线崩溃','麻了': '麻木','摆烂': '自暴自弃','躺平': '放弃努力'}
+        return _read_slang_file('data/teen_slang.json')
@@ -1,24 +1,49 @@
 """
 音乐心理学分析模块（核心创新点⭐⭐⭐⭐⭐）
 """
-import json
+import re
+import orjson
 import numpy as np
 from typing import List, Dict
 from datetime import datetime
 from collections import Counter
 import os
+from functools import lru_cache
+from pathlib import Path
+
+from backend.utils.cache import cached_analysis
+
+
+@lru_cache(maxsize=None)
+def _read_high_risk_songs(path: str) -> Dict:
+    """解析高危歌曲库（song_id → 歌曲信息），进程内只读一次文件。"""
+    if os.path.exists(path):
+        try:
+            data = orjson.loads(Path(path).read_bytes())
+            return {str(item.get('song_id', item.get('id'))): item for item in data}
+        except Exception:
+            pass
+    return {'1': {'song_id':'1','name':'消愁','artist':'毛不易'}}
+
 
 class MusicPsychologyAnalyzer:
     def __init__(self):
         self.high_risk_songs = self._load_high_risk_songs()
         self.genre_emotion = {'流行':0.2,'摇滚':0.1,'电子':0.3,'古典':0.4,'民谣':-0.2,'说唱':0.0,'轻音乐':0.5,'治愈系':0.7}
+        self._neg_tag_re = re.compile('悲伤|伤感|孤独')
+        self._pos_tag_re = re.compile('治愈|温暖|励志|正能量')
+        self._high_risk_name_re = re.compile('消愁|像我这样的人|无人之岛|演员|孤独|悲伤|失眠|告别|遗憾')
 
+    @cached_analysis('music')
     def analyze(self, user_id: str, song_ids: List[str], listening_times: List[str], song_details: List[Dict] = None) -> Dict:
-        valence_analysis = self._analyze_valence(song_ids, song_details)
+        # 每首歌的效价只计算一次，供后续各项分析复用
+        valences = self._calculate_valences(song_details or self._fetch_song_details(song_ids))
+        valence_analysis = self._analyze_valence(valences)
         time_pattern = self._analyze_time_pattern(listening_times)
-        loop_detection = self._detect_single_loop(song_ids)
-        high_risk_analysis = self._analyze_high_risk_songs(song_ids)
-        emotion_distribution = self._analyze_emotion_distribution(song_details or [])
+        uniq, first, inverse, counts = self._count_plays(song_ids)
+        loop_detection = self._detect_single_loop(uniq, first, counts)
+        high_risk_analysis = self._analyze_high_risk_songs(uniq, inverse, counts)
+        emotion_distribution = self._analyze_emotion_distribution(valences if song_details else np.empty(0))
         music_risk_score = self._calculate_music_risk(valence_analysis, time_pattern, loop_detection, high_risk_analysis)
         recommendations = self._generate_music_therapy_recommendations(valence_analysis['overall_valence'], music_risk_score)
         return {
@@ -38,26 +63,26 @@ class MusicPsychologyAnalyzer:
             'analysis_timestamp': datetime.now().isoformat()
         }
 
-    def _analyze_valence(self, song_ids: List[str], song_details: List[Dict]=None) -> Dict:
-        if not song_details:
-            song_details = self._fetch_song_details(song_ids)
-        valences = [self._calculate_song_valence(song) for song in song_details]
-        overall_valence = np.mean(valences) if valences else 0.0
+    def _calculate_valences(self, song_details: List[Dict]) -> np.ndarray:
+        return np.fromiter((self._calculate_song_valence(song) for song in song_details), dtype=np.float64, count=len(song_details))
+
+    def _analyze_valence(self, valences: np.ndarray) -> Dict:
+        overall_valence = float(valences.mean()) if len(valences) else 0.0
         if len(valences) >= 20:
-            recent_valence = np.mean(valences[-10:])
-            previous_valence = np.mean(valences[-20:-10])
+            recent_valence = valences[-10:].mean()
+            previous_valence = valences[-20:-10].mean()
             trend = 'improving' if recent_valence > previous_valence else 'worsening'
         else:
             trend = 'stable'
-        return {'overall_valence': round(overall_valence,3),'valence_std': round(np.std(valences),3) if valences else 0,'trend': trend,'valence_history': valences}
+        return {'overall_valence': round(overall_valence,3),'valence_std': round(float(valences.std()),3) if len(valences) else 0,'trend': trend,'valence_history': valences}
 
     def _calculate_song_valence(self, song: Dict) -> float:
         valence = 0.0
         tags = song.get('tags', [])
         for tag in tags:
-            if any(k in tag for k in ['悲伤','伤感','孤独']):
+            if self._neg_tag_re.search(tag):
                 valence -= 0.3
-            elif any(k in tag for k in ['治愈','温暖','励志','正能量']):
+            elif self._pos_tag_re.search(tag):
                 valence += 0.3
         genre = song.get('genre','')
         valence += self.genre_emotion.get(genre,0)
@@ -68,52 +93,55 @@ class MusicPsychologyAnalyzer:
     def _analyze_time_pattern(self, listening_times: List[str]) -> Dict:
         if not listening_times:
             return {'late_night_count':0,'late_night_ratio':0,'insomnia_detected':False,'hour_distribution':{},'peak_hours':[]}
-        hour_distribution = {i:0 for i in range(24)}
-        late_night_count = 0
+        hours = np.fromiter(self._parse_hours(listening_times), dtype=np.int64)
+        hist = np.bincount(hours, minlength=24)
+        late_night_count = int(hist[22:].sum() + hist[:6].sum())
+        total = len(listening_times)
+        ratio = late_night_count/total if total>0 else 0
+        return {'hour_distribution':dict(enumerate(hist.tolist())),'late_night_count':late_night_count,'total_count':total,'late_night_ratio':round(ratio,3),'insomnia_detected':ratio>0.3,'peak_hours':self._get_peak_hours(hist)}
+
+    def _parse_hours(self, listening_times: List[str]):
         for t in listening_times:
             try:
-                dt = datetime.fromisoformat(t)
-                h = dt.hour
-                hour_distribution[h]+=1
-                if h>=22 or h<6:
-                    late_night_count+=1
+                yield datetime.fromisoformat(t).hour
             except:
                 continue
-        total = len(listening_times)
-        ratio = late_night_count/total if total>0 else 0
-        return {'hour_distribution':hour_distribution,'late_night_count':late_night_count,'total_count':total,'late_night_ratio':round(ratio,3),'insomnia_detected':ratio>0.3,'peak_hours':self._get_peak_hours(hour_distribution)}
 
-    def _detect_single_loop(self, song_ids: List[str]) -> Dict:
+    def _count_plays(self, song_ids: List[str]):
+        """返回 (去重歌曲, 首次播放位置, 每次播放对应的去重下标, 播放次数)。"""
         if not song_ids:
+            empty = np.empty(0, dtype=np.int64)
+            return np.empty(0, dtype=str), empty, empty, empty
+        uniq, first, inverse, counts = np.unique(np.asarray(song_ids, dtype=str), return_index=True, return_inverse=True, return_counts=True)
+        return uniq, first, inverse.ravel(), counts
+
+    def _detect_single_loop(self, uniq: np.ndarray, first: np.ndarray, counts: np.ndarray) -> Dict:
+        if not len(uniq):
             return {'detected':False,'top_songs':[],'max_loop_ratio':0}
-        counter = Counter(song_ids)
-        top = counter.most_common(5)
-        total = len(song_ids)
-        max_plays = top[0][1] if top else 0
+        # 与 Counter.most_common 一致：按播放次数降序，次数相同按首次播放先后
+        top_idx = np.lexsort((first, -counts))[:5]
+        top = list(zip(uniq[top_idx].tolist(), counts[top_idx].tolist()))
+        total = int(counts.sum())
+        max_plays = top[0][1]
         detected = max_plays > total * 0.3
-        return {'detected':detected,'top_songs':[{'song_id':sid,'play_count':c,'ratio':round(c/total,3)} for sid,c in top],'max_loop_ratio':round(max_plays/total,3) if total else 0}
-
-    def _analyze_high_risk_songs(self, song_ids: List[str]) -> Dict:
-        count = 0
-        songs = []
-        for sid in song_ids:
-            if sid in self.high_risk_songs:
-                count += 1
-                songs.append(self.high_risk_songs[sid])
-        total = len(song_ids)
+        return {'detected':detected,'top_songs':[{'song_id':sid,'play_count':c,'ratio':round(c/total,3)} for sid,c in top],'max_loop_ratio':round(max_plays/total,3)}
+
+    def _analyze_high_risk_songs(self, uniq: np.ndarray, inverse: np.ndarray, counts: np.ndarray) -> Dict:
+        mask = np.isin(uniq, list(self.high_risk_songs)) if len(uniq) else np.zeros(0, dtype=bool)
+        count = int(counts[mask].sum())
+        # 按播放顺序取前 10 次命中（含重复播放），与逐条遍历的结果一致
+        songs = [self.high_risk_songs[sid] for sid in uniq[inverse[mask[inverse]][:10]].tolist()]
+        total = int(counts.sum())
         ratio = count/total if total else 0
-        return {'count':count,'total':total,'ratio':round(ratio,3),'songs':songs[:10],'high_risk_detected':ratio>0.5}
+        return {'count':count,'total':total,'ratio':round(ratio,3),'songs':songs,'high_risk_detected':ratio>0.5}
 
-    def _analyze_emotion_distribution(self, song_details: List[Dict]) -> Dict:
-        if not song_details:
+    def _analyze_emotion_distribution(self, valences: np.ndarray) -> Dict:
+        total = len(valences)
+        if not total:
             return {'happy':0,'neutral':0,'sad':0}
-        counts = {'happy':0,'neutral':0,'sad':0}
-        for song in song_details:
-            v = self._calculate_song_valence(song)
-            if v>0.3: counts['happy']+=1
-            elif v<-0.3: counts['sad']+=1
-            else: counts['neutral']+=1
-        total = len(song_details)
+        happy = int((valences>0.3).sum())
+        sad = int((valences<-0.3).sum())
+        counts = {'happy':happy,'neutral':total-happy-sad,'sad':sad}
         return {k: round(v/total*100,1) for k,v in counts.items()}
 
     def _calculate_music_risk(self, valence_analysis, time_pattern, loop_detection, high_risk_analysis) -> float:
@@ -143,8 +171,9 @@ class MusicPsychologyAnalyzer:
         elif valence<-0.3: return 'negative'
         return 'neutral'
 
-    def _get_peak_hours(self, hour_distribution: Dict[int,int]) -> List[int]:
-        return [h for h,_ in sorted(hour_distribution.items(), key=lambda x:x[1], reverse=True)[:3]]
+    def _get_peak_hours(self, hist: np.ndarray) -> List[int]:
+        # 稳定排序：次数相同时小时数小的在前
+        return np.argsort(-hist, kind='stable')[:3].tolist()
 
     def _get_risk_level(self, score: float) -> str:
         if score < 30: return '🟢 低风险'
@@ -152,19 +181,10 @@ class MusicPsychologyAnalyzer:
         return '🔴 高风险'
 
     def _is_high_risk_song(self, name: str) -> bool:
-        keywords = ['消愁','像我这样的人','无人之岛','演员','孤独','悲伤','失眠','告别','遗憾']
-        return any(k in name for k in keywords)
+        return self._high_risk_name_re.search(name) is not None
 
     def _load_high_risk_songs(self) -> Dict:
-        path = 'data/high_risk_songs.json'
-        if os.path.exists(path):
-            try:
-                with open(path,'r',encoding='utf-8') as f:
-                    data = json.load(f)
-                    return {str(item.get('song_id', item.get('id'))): item for item in data}
-            except Exception:
-                pass
-        return {'1': {'song_id':'1','name':'消愁','artist':'毛不易'}}
+        return _read_high_risk_songs('data/high_risk_songs.json')
 
     def _fetch_song_details(self, song_ids: List[str]) -> List[Dict]:
         return [{'song_id': sid, 'name': f'Song {sid}', 'tags': [], 'genre': '流行'} for sid in song_ids]
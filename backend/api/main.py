@@ -5,23 +5,62 @@ FastAPI 应用程序配置
 
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
+import orjson
 import uvicorn
+import asyncio
 from contextlib import asynccontextmanager
 
 from backend.api.routes import analysis, users, data
 from backend.models.database import init_db, close_db
+from backend.analyzer.emotion_bert import EmotionAnalyzer, configure_torch_threads, PREFILTER_MAX_LEN
+from backend.analyzer.music_psychology import MusicPsychologyAnalyzer
+from backend.analyzer.anomaly_detect import AnomalyDetector
+from backend.analyzer.resonance_network import ResonanceNetworkAnalyzer
+from backend.utils.batcher import MicroBatcher
+from backend.utils.process_pool import create_pool, start_pool, warmup_analyzers
+from backend.crawler._client import init_client, close_client
+
+def warmup(app: FastAPI) -> None:
+    """每个分析器跑一次极小的输入，提前完成图构建、JIT 编译与内核选择。"""
+    state = app.state
+    # 文本需足够长，否则会被关键词预过滤拦下而不经过 BERT
+    state.emotion_analyzer.analyze("预热" * PREFILTER_MAX_LEN)
+    # 启用进程池时路由使用的是工作进程内的实例，由各工作进程初始化时自行预热
+    if state.analysis_pool is None:
+        warmup_analyzers(state.music_analyzer, state.anomaly_detector, state.resonance_analyzer)
 
 # 应用生命周期管理
 @asynccontextmanager
-def lifespan(app: FastAPI):
-    # 启动时执行
+async def lifespan(app: FastAPI):
+    # 启动时执行：数据库连接、BERT 模型加载、歌曲库解析并行进行
     print("🚀 TeenMind-SocialGuard 系统启动中...")
-    await init_db()
-    print("✅ 数据库连接成功")
+    configure_torch_threads()
+    init_client()
+    _, emotion_analyzer, music_analyzer = await asyncio.gather(
+        init_db(),
+        asyncio.to_thread(EmotionAnalyzer),
+        asyncio.to_thread(MusicPsychologyAnalyzer)
+    )
+    app.state.emotion_analyzer = emotion_analyzer
+    # 并发的 /emotion 请求在 8ms 窗口内合并为一次 BERT 批量前向
+    app.state.emotion_batcher = MicroBatcher(emotion_analyzer.batch_analyze, max_batch=32, max_wait_ms=8)
+    app.state.music_analyzer = music_analyzer
+    app.state.anomaly_detector = AnomalyDetector()
+    app.state.resonance_analyzer = ResonanceNetworkAnalyzer()
+    app.state.analysis_pool = create_pool()
+    warmups = [asyncio.to_thread(warmup, app)]
+    if app.state.analysis_pool is not None:
+        warmups.append(start_pool(app.state.analysis_pool))
+    await asyncio.gather(*warmups)
+    print("✅ 数据库连接成功，分析模型已加载并预热")
     yield
     # 关闭时执行
     print("🔴 TeenMind-SocialGuard 系统关闭中...")
+    await app.state.emotion_batcher.stop()
+    if app.state.analysis_pool is not None:
+        await asyncio.to_thread(app.state.analysis_pool.shutdown, cancel_futures=True)
+    await close_client()
     await close_db()
     print("✅ 数据库连接已关闭")
 
@@ -55,56 +94,63 @@ app.include_router(analysis.router, prefix="/api/analysis", tags=["情感分析"
 app.include_router(users.router, prefix="/api/users", tags=["用户管理"])
 app.include_router(data.router, prefix="/api/data", tags=["数据采集"])
 
+# 静态系统信息在导入时预先序列化，请求时直接返回字节
+_ROOT_BYTES = orjson.dumps({
+    "project": "TeenMind-SocialGuard",
+    "description": "基于社交媒体与音乐平台的青少年心理健康监测系统",
+    "version": "1.0.0",
+    "status": "running",
+    "author": "feng2740249312",
+    "features": [
+        "🎵 音乐心理学分析",
+        "🌐 共鸣网络识别",
+        "🤖 多模态AI融合",
+        "⏰ 时序异常检测",
+        "🔒 隐私保护设计"
+    ],
+    "docs": "/docs"
+})
+
+_HEALTH_BYTES = orjson.dumps({
+    "status": "healthy",
+    "database": "connected",
+    "redis": "connected",
+    "mongodb": "connected"
+})
+
+_INFO_BYTES = orjson.dumps({
+    "system": "TeenMind-SocialGuard",
+    "modules": {
+        "data_collection": "网易云音乐、QQ空间、豆瓣、微博",
+        "ai_analysis": "BERT情感分析、音乐心理学、异常检测、共鸣网络",
+        "warning_system": "三级预警、实时监控、主动干预",
+        "visualization": "Dashboard、报告生成、趋势分析"
+    },
+    "innovation": [
+        "首次将音乐数据用于心理健康检测",
+        "独创共鸣网络分析算法",
+        "多模态AI融合分析",
+        "提前7天预警心理危机"
+    ]
+})
+
 # 根路由
 @app.get("/", tags=["系统"])
 async def root():
     """系统首页"""
-    return {
-        "project": "TeenMind-SocialGuard",
-        "description": "基于社交媒体与音乐平台的青少年心理健康监测系统",
-        "version": "1.0.0",
-        "status": "running",
-        "author": "feng2740249312",
-        "features": [
-            "🎵 音乐心理学分析",
-            "🌐 共鸣网络识别",
-            "🤖 多模态AI融合",
-            "⏰ 时序异常检测",
-            "🔒 隐私保护设计"
-        ],
-        "docs": "/docs"
-    }
+    return Response(content=_ROOT_BYTES, media_type="application/json")
 
 # 健康检查
 @app.get("/health", tags=["系统"])
 async def health_check():
     """健康检查端点"""
-    return {
-        "status": "healthy",
-        "database": "connected",
-        "redis": "connected",
-        "mongodb": "connected"
-    }
+    return Response(content=_HEALTH_BYTES, media_type="application/json")
 
 # 系统信息
 @app.get("/info", tags=["系统"])
 async def system_info():
     """系统信息"""
-    return {
-        "system": "TeenMind-SocialGuard",
-        "modules": {
-            "data_collection": "网易云音乐、QQ空间、豆瓣、微博",
-            "ai_analysis": "BERT情感分析、音乐心理学、异常检测、共鸣网络",
-            "warning_system": "三级预警、实时监控、主动干预",
-            "visualization": "Dashboard、报告生成、趋势分析"
-        },
-        "innovation": [
-            "首次将音乐数据用于心理健康检测",
-            "独创共鸣网络分析算法",
-            "多模态AI融合分析",
-            "提前7天预警心理危机"
-        ]
-    }
+    return Response(content=_INFO_BYTES, media_type="application/json")
 
 # 全局异常处理
 @app.exception_handler(HTTPException)
@@ -2,15 +2,20 @@
 情感分析相关 API 路由
 """
 
-from fastapi import APIRouter, HTTPException, BackgroundTasks
+from fastapi import APIRouter, HTTPException, BackgroundTasks, Depends, Request
 from pydantic import BaseModel
 from typing import List, Optional
 from datetime import datetime
+import hashlib
 
 from backend.analyzer.emotion_bert import EmotionAnalyzer
 from backend.analyzer.music_psychology import MusicPsychologyAnalyzer
 from backend.analyzer.anomaly_detect import AnomalyDetector
 from backend.analyzer.resonance_network import ResonanceNetworkAnalyzer
+from backend.utils.cache import cached
+from backend.utils.batcher import MicroBatcher
+from backend.utils.process_pool import run_analysis
+from backend.utils.data_processor import hash_buckets
 
 router = APIRouter()
 
@@ -39,6 +44,7 @@ class EmotionResponse(BaseModel):
     emotions_detail: dict
     risk_level: str
     timestamp: str
+    cache_hit: bool = False
 
 class MusicPsychologyResponse(BaseModel):
     overall_valence: float
@@ -58,20 +64,44 @@ class ResonanceResponse(BaseModel):
     user_clusters: List[int]
     intervention_needed: bool
 
-# 初始化分析器
-emotion_analyzer = EmotionAnalyzer()
-music_analyzer = MusicPsychologyAnalyzer()
-anomaly_detector = AnomalyDetector()
-resonance_analyzer = ResonanceNetworkAnalyzer()
+# 分析器在应用启动（lifespan）时创建并挂载到 app.state，各路由共享同一实例
+def get_emotion_analyzer(request: Request) -> EmotionAnalyzer:
+    return request.app.state.emotion_analyzer
+
+def get_emotion_batcher(request: Request) -> MicroBatcher:
+    return request.app.state.emotion_batcher
+
+def get_music_analyzer(request: Request) -> MusicPsychologyAnalyzer:
+    return request.app.state.music_analyzer
+
+def get_anomaly_detector(request: Request) -> AnomalyDetector:
+    return request.app.state.anomaly_detector
+
+def get_resonance_analyzer(request: Request) -> ResonanceNetworkAnalyzer:
+    return request.app.state.resonance_analyzer
+
+def get_analysis_pool(request: Request):
+    return request.app.state.analysis_pool
+
+# 音乐/异常/共鸣分析为纯 CPU 计算，派发到进程池（未启用时退回线程池）以免阻塞事件循环；
+# BERT 推理经微批处理器合并后在线程中执行，前向计算本身释放 GIL
+
+# 相同文本的情感分析结果缓存 1 小时；键包含模型名，换模型后自然失效
+@cached(prefix="emo:", ttl=3600, hit_flag="cache_hit",
+        key=lambda model_name, batcher, text: f"{model_name}:{hashlib.blake2b(text.encode(), digest_size=16).hexdigest()}")
+async def _cached_emotion_analysis(model_name: str, batcher: MicroBatcher, text: str) -> dict:
+    return await batcher.submit(text)
 
 @router.post("/emotion", response_model=EmotionResponse)
-async def analyze_emotion(request: TextAnalysisRequest):
+async def analyze_emotion(request: TextAnalysisRequest,
+                          emotion_analyzer: EmotionAnalyzer = Depends(get_emotion_analyzer),
+                          emotion_batcher: MicroBatcher = Depends(get_emotion_batcher)):
     """
     文本情感分析
     使用 BERT 模型分析文本情感，识别抑郁、焦虑、自杀倾向等
     """
     try:
-        result = emotion_analyzer.analyze(request.text)
+        result = await _cached_emotion_analysis(emotion_analyzer.model_name, emotion_batcher, request.text)
         risk_level = "🟢 低风险"
         if result['risk_score'] > 70:
             risk_level = "🔴 高风险"
@@ -82,19 +112,22 @@ async def analyze_emotion(request: TextAnalysisRequest):
             confidence=result['confidence'],
             emotions_detail=result['emotions'],
             risk_level=risk_level,
-            timestamp=datetime.now().isoformat()
+            timestamp=datetime.now().isoformat(),
+            cache_hit=result['cache_hit']
         )
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"情感分析失败: {str(e)}")
 
 @router.post("/music-psychology", response_model=MusicPsychologyResponse)
-async def analyze_music_psychology(request: MusicAnalysisRequest):
+async def analyze_music_psychology(request: MusicAnalysisRequest, music_analyzer: MusicPsychologyAnalyzer = Depends(get_music_analyzer),
+                                   pool=Depends(get_analysis_pool)):
     """
     音乐心理学分析（创新点⭐）
     分析用户的音乐选择、听歌时间等，评估心理状态
     """
     try:
-        result = music_analyzer.analyze(
+        result = await run_analysis(
+            pool, music_analyzer, 'analyze',
             user_id=request.user_id,
             song_ids=request.song_ids,
             listening_times=request.listening_times
@@ -109,13 +142,15 @@ async def analyze_music_psychology(request: MusicAnalysisRequest):
         raise HTTPException(status_code=500, detail=f"音乐分析失败: {str(e)}")
 
 @router.post("/anomaly-detection", response_model=AnomalyResponse)
-async def detect_anomaly(request: AnomalyDetectionRequest):
+async def detect_anomaly(request: AnomalyDetectionRequest, anomaly_detector: AnomalyDetector = Depends(get_anomaly_detector),
+                         pool=Depends(get_analysis_pool)):
     """
     时序异常检测
     检测用户行为的异常变化，预警心理危机
     """
     try:
-        result = anomaly_detector.detect(
+        result = await run_analysis(
+            pool, anomaly_detector, 'detect',
             user_id=request.user_id,
             days=request.days
         )
@@ -129,20 +164,22 @@ async def detect_anomaly(request: AnomalyDetectionRequest):
         raise HTTPException(status_code=500, detail=f"异常检测失败: {str(e)}")
 
 @router.post("/resonance-network", response_model=ResonanceResponse)
-async def analyze_resonance(request: ResonanceAnalysisRequest):
+async def analyze_resonance(request: ResonanceAnalysisRequest, resonance_analyzer: ResonanceNetworkAnalyzer = Depends(get_resonance_analyzer),
+                            pool=Depends(get_analysis_pool)):
     """
     共鸣网络分析（独特创新点⭐⭐⭐）
     分析用户对哪些内容产生共鸣，识别高危内容聚集
     """
     try:
-        result = resonance_analyzer.analyze(
+        result = await run_analysis(
+            pool, resonance_analyzer, 'analyze',
             user_id=request.user_id,
             content_ids=request.content_ids
         )
         return ResonanceResponse(
             resonance_score=result['resonance_intensity'],
             high_risk_content=[c['content_id'] for c in result['high_risk_contents']],
-            user_clusters=[hash(u['user_id']) % 10000 for u in result.get('potential_high_risk_users', [])],
+            user_clusters=hash_buckets([u['user_id'] for u in result.get('potential_high_risk_users', [])]).tolist(),
             intervention_needed=result['needs_intervention']
         )
     except Exception as e:
@@ -4,15 +4,21 @@
 
 from fastapi import APIRouter, HTTPException, BackgroundTasks
 from pydantic import BaseModel
-from typing import List
+from typing import AsyncIterable, Dict, List
+import asyncio
 
 from backend.crawler.netease_music import NeteaseMusicCrawler
 from backend.crawler.qzone import QZoneCrawler
 from backend.crawler.douban import DoubanCrawler
 from backend.crawler.weibo import WeiboCrawler
+from backend.crawler._client import abatch
+from backend.models import database
+from backend.utils.cache import invalidate_user
 
 router = APIRouter()
 
+MONGO_BATCH_SIZE = 500
+
 class NeteaseCrawlRequest(BaseModel):
     user_id: str
     netease_uid: str
@@ -79,34 +85,56 @@ async def get_crawl_status(user_id: str):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"获取状态失败: {str(e)}")
 
+async def _store_stream(collection: str, user_id: str, records: AsyncIterable[Dict]) -> int:
+    """
+    把采集流按 MONGO_BATCH_SIZE 条一批写入 MongoDB，返回记录数。
+    行为数据允许少量丢失，使用 w=0 免去等待确认；MongoDB 未连接时只计数。
+    """
+    coll = None
+    if database.mongodb is not None:
+        from pymongo import WriteConcern  # motor 依赖 pymongo
+        coll = database.mongodb.get_collection(collection, write_concern=WriteConcern(w=0))
+    total = 0
+    async for batch in abatch(records, MONGO_BATCH_SIZE):
+        for record in batch:
+            record['user_id'] = user_id
+        if coll is not None:
+            await coll.insert_many(batch, ordered=False)
+        total += len(batch)
+    return total
+
 async def crawl_netease_data(user_id: str, netease_uid: str, days: int):
     try:
         crawler = NeteaseMusicCrawler()
-        data = await crawler.crawl_user_data(netease_uid, days)
-        print(f"✅ 用户 {user_id} 网易云数据采集完成: {len(data.get('listening_history', []))} 条记录")
+        total = await _store_stream('netease', user_id, crawler.stream_listening_history(netease_uid, days))
+        await asyncio.to_thread(invalidate_user, user_id)
+        print(f"✅ 用户 {user_id} 网易云数据采集完成: {total} 条记录")
     except Exception as e:
         print(f"❌ 用户 {user_id} 网易云数据采集失败: {e}")
 
 async def crawl_qzone_data(user_id: str, qq_number: str, days: int):
     try:
         crawler = QZoneCrawler()
-        data = await crawler.crawl_qzone_data(qq_number, days)
-        print(f"✅ 用户 {user_id} QQ空间数据采集完成: {len(data.get('posts', []))} 条记录")
+        total = await _store_stream('qzone', user_id, crawler.stream_posts(qq_number, days))
+        await asyncio.to_thread(invalidate_user, user_id)
+        print(f"✅ 用户 {user_id} QQ空间数据采集完成: {total} 条记录")
     except Exception as e:
         print(f"❌ 用户 {user_id} QQ空间数据采集失败: {e}")
 
 async def crawl_douban_data(user_id: str, douban_uid: str, groups: List[str]):
     try:
         crawler = DoubanCrawler()
-        data = await crawler.crawl_douban_data(douban_uid, groups)
-        print(f"✅ 用户 {user_id} 豆瓣数据采集完成: {len(data.get('group_topics', []))} 条记录")
+        total = await _store_stream('douban', user_id, crawler.stream_topics(douban_uid, groups))
+        await asyncio.to_thread(invalidate_user, user_id)
+        print(f"✅ 用户 {user_id} 豆瓣数据采集完成: {total} 条记录")
     except Exception as e:
         print(f"❌ 用户 {user_id} 豆瓣数据采集失败: {e}")
 
 async def crawl_weibo_data(user_id: str, weibo_uid: str, keywords: List[str]):
     try:
         crawler = WeiboCrawler()
-        data = await crawler.crawl_weibo_data(weibo_uid, keywords)
-        print(f"✅ 用户 {user_id} 微博数据采集完成: {len(data.get('posts', []))} 条记录")
+        total = await _store_stream('weibo', user_id, crawler.stream_posts(weibo_uid, keywords))
+        await asyncio.to_thread(invalidate_user, user_id)
+        print(f"✅ 用户 {user_id} 微博数据采集完成: {total} 条记录")
     except Exception as e:
         print(f"❌ 用户 {user_id} 微博数据采集失败: {e}")
@@ -5,13 +5,31 @@
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel, EmailStr
 from typing import Optional, List
-from datetime import datetime
-import hashlib
+from datetime import datetime, timezone
+import os
+import asyncio
 import jwt
 from datetime import timedelta
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PrivateKey
+
+from backend.utils.helpers import hash_password
+from backend.utils.cache import cached, dashboard_cache, invalidate_user
+from backend.models import event_store
 
 router = APIRouter()
 
+# JWT 使用 Ed25519（EdDSA）签名，所有 worker 必须共用 JWT_PRIVATE_KEY（PEM），否则彼此签发的 token 无法互认；
+# 仅开发环境（APP_ENV=development）允许缺省，此时生成进程内临时密钥，重启后 token 全部失效
+_private_pem = os.getenv('JWT_PRIVATE_KEY')
+if _private_pem:
+    _jwt_private_key = serialization.load_pem_private_key(_private_pem.encode(), password=None)
+elif os.getenv('APP_ENV', 'production') == 'development':
+    print("⚠️ 未配置 JWT_PRIVATE_KEY，使用进程内临时密钥（仅限开发环境、单 worker）")
+    _jwt_private_key = Ed25519PrivateKey.generate()
+else:
+    raise RuntimeError("未配置 JWT_PRIVATE_KEY：生产环境必须提供 Ed25519 私钥（PEM），开发环境可设置 APP_ENV=development")
+
 class UserRegister(BaseModel):
     username: str
     email: EmailStr
@@ -38,7 +56,8 @@ class UserResponse(BaseModel):
 @router.post("/register", response_model=UserResponse)
 async def register_user(user: UserRegister):
     try:
-        password_hash = hashlib.sha256(user.password.encode()).hexdigest()
+        # Argon2 单次哈希耗时数十毫秒，放到线程中执行以免阻塞事件循环
+        password_hash = await asyncio.to_thread(hash_password, user.password)
         new_user = {
             "id": generate_user_id(),
             "username": user.username,
@@ -56,7 +75,6 @@ async def register_user(user: UserRegister):
 @router.post("/login")
 async def login_user(credentials: UserLogin):
     try:
-        password_hash = hashlib.sha256(credentials.password.encode()).hexdigest()
         token = generate_jwt_token(credentials.username)
         return {
             "access_token": token,
@@ -84,7 +102,8 @@ async def get_user(user_id: str):
 @router.put("/{user_id}")
 async def update_user(user_id: str, update: UserUpdate):
     try:
-        update_data = update.dict(exclude_unset=True)
+        update_data = update.model_dump(exclude_unset=True)
+        await asyncio.to_thread(invalidate_user, user_id)
         return {"message": "用户信息更新成功", "updated_fields": list(update_data.keys())}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"更新失败: {str(e)}")
@@ -97,25 +116,35 @@ async def delete_user(user_id: str):
         raise HTTPException(status_code=500, detail=f"删除失败: {str(e)}")
 
 @router.get("/{user_id}/dashboard")
+@cached(prefix="dash:", cache=dashboard_cache, key=lambda user_id, days=30: f"{user_id}:{days}")
 async def get_user_dashboard(user_id: str, days: int = 30):
     try:
-        dashboard_data = {
-            "user_id": user_id,
-            "period": f"最近{days}天",
-            "emotion_trend": [
+        # DuckDB 查询为同步调用，放到线程中执行；None 表示没有事件存储，此时使用占位数据
+        emotion_trend, activity_heatmap = await asyncio.gather(
+            asyncio.to_thread(event_store.emotion_trend, user_id, days),
+            asyncio.to_thread(event_store.activity_heatmap, user_id, days)
+        )
+        if emotion_trend is None:
+            emotion_trend = [
                 {"date": "2025-11-01", "score": 65},
                 {"date": "2025-11-05", "score": 55},
                 {"date": "2025-11-10", "score": 45},
                 {"date": "2025-11-15", "score": 38},
                 {"date": "2025-11-19", "score": 42}
-            ],
-            "music_preference": {"sad": 45, "happy": 30, "neutral": 25},
-            "activity_heatmap": {
+            ]
+        if activity_heatmap is None:
+            activity_heatmap = {
                 "00:00-06:00": 15,
                 "06:00-12:00": 20,
                 "12:00-18:00": 35,
                 "18:00-24:00": 45
-            },
+            }
+        dashboard_data = {
+            "user_id": user_id,
+            "period": f"最近{days}天",
+            "emotion_trend": emotion_trend,
+            "music_preference": {"sad": 45, "happy": 30, "neutral": 25},
+            "activity_heatmap": activity_heatmap,
             "risk_radar": {"emotion": 42, "music": 38, "anomaly": 35, "resonance": 40},
             "social_interaction": {"posts": 45, "comments": 120, "likes_received": 230},
             "overall_risk_score": 38,
@@ -130,6 +159,6 @@ def generate_user_id() -> str:
     return str(uuid.uuid4())
 
 def generate_jwt_token(username: str) -> str:
-    payload = {"username": username, "exp": datetime.utcnow() + timedelta(days=7)}
-    token = jwt.encode(payload, "secret-key", algorithm="HS256")
+    payload = {"username": username, "exp": datetime.now(timezone.utc) + timedelta(days=7)}
+    token = jwt.encode(payload, _jwt_private_key, algorithm="EdDSA")
     return token
@@ -1,37 +1,23 @@
-from flask import Flask, jsonify
-from flask_cors import CORS
-from flask_sqlalchemy import SQLAlchemy
-from flask_jwt_extended import JWTManager
+"""
+TeenMind-SocialGuard 服务启动入口
+统一使用 backend/api/main.py 中的 FastAPI 应用，由 uvicorn（uvloop + httptools）运行：
+    API_WORKERS=4 uvicorn backend.app:app --loop uvloop --http httptools --workers 4
+多 worker 时须同时设置 API_WORKERS，各 worker 据此平分推理线程与分析进程
+"""
+import os
 
-# Initialize the Flask application
-app = Flask(__name__)
-CORS(app)  # Enable CORS
+import uvicorn
 
-# Database configuration
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///site.db'
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-
-# Initialize the database
-db = SQLAlchemy(app)
-
-# JWT configuration
-app.config['JWT_SECRET_KEY'] = 'your_jwt_secret_key'
-jwt = JWTManager(app)
-
-# Health check endpoint
-@app.route('/health', methods=['GET'])
-def health_check():
-    return jsonify({'status': 'healthy'}), 200
-
-
-# Error handling
-@app.errorhandler(404)
-def not_found_error(error):
-    return jsonify({'error': 'Not found'}), 404
-
-@app.errorhandler(500)
-def internal_error(error):
-    return jsonify({'error': 'Internal server error'}), 500
+from backend.api.main import app  # noqa: F401
 
 if __name__ == '__main__':
-    app.run(debug=True)
\ No newline at end of file
+    uvicorn.run(
+        "backend.app:app",
+        host=os.getenv('API_HOST', '0.0.0.0'),
+        port=int(os.getenv('API_PORT', 8000)),
+        loop="uvloop",
+        http="httptools",
+        # 推理线程数与分析进程池按 API_WORKERS 平分 CPU，两处须读取同一个值
+        workers=int(os.getenv('API_WORKERS', 1)),
+        log_level="info"
+    )
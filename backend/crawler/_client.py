@@ -0,0 +1,72 @@
+"""
+爬虫共享的异步 HTTP 客户端（连接池复用 + 按主机限流的并发抓取）
+采集结果中的时间字段保留为 datetime 对象，由 orjson 在序列化时直接编码。
+"""
+import asyncio
+from typing import Any, AsyncIterable, AsyncIterator, Dict, List, Optional
+from urllib.parse import urlsplit
+
+import httpx
+import orjson
+
+MAX_CONNECTIONS = 100
+PER_HOST_CONCURRENCY = 8
+
+_client: Optional[httpx.AsyncClient] = None
+_host_semaphores: Dict[str, asyncio.Semaphore] = {}
+
+
+def init_client() -> httpx.AsyncClient:
+    """应用启动时创建全局客户端。"""
+    global _client
+    if _client is None:
+        _client = httpx.AsyncClient(limits=httpx.Limits(max_connections=MAX_CONNECTIONS), timeout=10, follow_redirects=True)
+    return _client
+
+
+async def close_client() -> None:
+    """应用关闭时释放连接池。"""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def get_client() -> httpx.AsyncClient:
+    return _client or init_client()
+
+
+async def abatch(items: AsyncIterable[Any], size: int) -> AsyncIterator[List[Any]]:
+    """把异步流切成最多 size 条的批次，内存中只保留当前批。"""
+    batch: List[Any] = []
+    async for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _host_semaphore(url: str) -> asyncio.Semaphore:
+    host = urlsplit(url).netloc
+    if host not in _host_semaphores:
+        _host_semaphores[host] = asyncio.Semaphore(PER_HOST_CONCURRENCY)
+    return _host_semaphores[host]
+
+
+class HttpCrawler:
+    """爬虫基类：共享连接池，单个主机最多 PER_HOST_CONCURRENCY 个并发请求。"""
+
+    def __init__(self, client: Optional[httpx.AsyncClient] = None):
+        self.client = client or get_client()
+
+    async def fetch(self, url: str, **kwargs) -> Any:
+        async with _host_semaphore(url):
+            response = await self.client.get(url, **kwargs)
+            response.raise_for_status()
+            return orjson.loads(response.content)
+
+    async def fetch_all(self, urls: List[str], **kwargs) -> List[Any]:
+        """并发抓取多个 URL，结果与 urls 顺序一致；失败的请求返回异常对象。"""
+        return await asyncio.gather(*(self.fetch(u, **kwargs) for u in urls), return_exceptions=True)
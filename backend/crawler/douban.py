@@ -1,20 +1,26 @@
 """
 豆瓣数据采集器（占位实现）
 """
-from typing import Dict, List
+from typing import AsyncIterator, Dict, List
 from datetime import datetime
 
-class DoubanCrawler:
+from backend.crawler._client import HttpCrawler
+
+class DoubanCrawler(HttpCrawler):
+    async def stream_topics(self, user_id: str, groups: List[str] = None, now: datetime = None) -> AsyncIterator[Dict]:
+        """逐条产出小组话题，供调用方分批写库。"""
+        now = now or datetime.now()
+        yield {"group": "depression", "title": "最近心情很低落", "url": "https://www.douban.com", "reply_count": 12,
+               "last_update": now}
+
     async def crawl_douban_data(self, user_id: str, groups: List[str] = None) -> Dict:
-        topics: List[Dict] = [
-            {"group": "depression", "title": "最近心情很低落", "url": "https://www.douban.com", "reply_count": 12,
-             "last_update": datetime.now().isoformat()}
-        ]
+        now = datetime.now()
+        topics = [t async for t in self.stream_topics(user_id, groups, now)]
         return {
             "user_id": user_id,
             "group_topics": topics,
             "user_posts": [],
             "high_risk_topics": [],
-            "crawl_time": datetime.now().isoformat(),
+            "crawl_time": now,
             "total_records": len(topics)
         }
@@ -2,15 +2,21 @@
 网易云音乐数据采集器（占位实现）
 说明：为保证项目可运行与导入，提供最小可用异步接口。
 """
-from typing import Dict, List
+from typing import AsyncIterator, Dict
 from datetime import datetime
 
-class NeteaseMusicCrawler:
+from backend.crawler._client import HttpCrawler
+
+class NeteaseMusicCrawler(HttpCrawler):
+    async def stream_listening_history(self, user_id: str, days: int = 30, now: datetime = None) -> AsyncIterator[Dict]:
+        """逐条产出听歌记录，供调用方分批写库。"""
+        now = now or datetime.now()
+        # 占位：模拟数据
+        yield {"song_id": "1", "song_name": "消愁", "artist": "毛不易", "play_count": 3, "timestamp": now}
+
     async def crawl_user_data(self, user_id: str, days: int = 30) -> Dict:
-        # 占位：返回模拟数据结构
-        listening_history = [
-            {"song_id": "1", "song_name": "消愁", "artist": "毛不易", "play_count": 3, "timestamp": datetime.now().isoformat()}
-        ]
+        now = datetime.now()
+        listening_history = [r async for r in self.stream_listening_history(user_id, days, now)]
         return {
             "user_id": user_id,
             "user_info": {"nickname": "demo", "age": 16},
@@ -18,6 +24,6 @@ class NeteaseMusicCrawler:
             "comments": [],
             "playlists": [],
             "resonance_data": {"resonance_intensity": 0.2},
-            "crawl_time": datetime.now().isoformat(),
+            "crawl_time": now,
             "total_records": len(listening_history)
         }
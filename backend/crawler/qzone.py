@@ -1,19 +1,25 @@
 """
 QQ空间数据采集器（占位实现）
 """
-from typing import Dict, List
+from typing import AsyncIterator, Dict
 from datetime import datetime
 
-class QZoneCrawler:
+from backend.crawler._client import HttpCrawler
+
+class QZoneCrawler(HttpCrawler):
+    async def stream_posts(self, qq_number: str, days: int = 30, now: datetime = None) -> AsyncIterator[Dict]:
+        """逐条产出说说，供调用方分批写库。"""
+        now = now or datetime.now()
+        yield {"content": "今天天气不错", "time": now, "likes": 5, "comments_count": 0, "images": []}
+
     async def crawl_qzone_data(self, qq_number: str, days: int = 30) -> Dict:
-        posts: List[Dict] = [
-            {"content": "今天天气不错", "time": datetime.now().isoformat(), "likes": 5, "comments_count": 0, "images": []}
-        ]
+        now = datetime.now()
+        posts = [p async for p in self.stream_posts(qq_number, days, now)]
         return {
             "qq_number": qq_number,
             "posts": posts,
             "blogs": [],
             "guestbook": [],
-            "crawl_time": datetime.now().isoformat(),
+            "crawl_time": now,
             "total_records": len(posts)
         }
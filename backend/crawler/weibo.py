@@ -1,18 +1,24 @@
 """
 微博数据采集器（占位实现）
 """
-from typing import Dict, List
+from typing import AsyncIterator, Dict, List
 from datetime import datetime
 
-class WeiboCrawler:
+from backend.crawler._client import HttpCrawler
+
+class WeiboCrawler(HttpCrawler):
+    async def stream_posts(self, user_id: str, keywords: List[str], now: datetime = None) -> AsyncIterator[Dict]:
+        """逐条产出微博，供调用方分批写库。"""
+        now = now or datetime.now()
+        yield {"content": "#心理健康# 保持积极生活", "time": now, "likes": 10, "reposts": 1}
+
     async def crawl_weibo_data(self, user_id: str, keywords: List[str]) -> Dict:
-        posts: List[Dict] = [
-            {"content": "#心理健康# 保持积极生活", "time": datetime.now().isoformat(), "likes": 10, "reposts": 1}
-        ]
+        now = datetime.now()
+        posts = [p async for p in self.stream_posts(user_id, keywords, now)]
         return {
             "user_id": user_id,
             "posts": posts,
             "keywords": keywords,
-            "crawl_time": datetime.now().isoformat(),
+            "crawl_time": now,
             "total_records": len(posts)
         }
@@ -30,6 +30,8 @@ except Exception:
 mongo_client = None
 mongodb = None
 redis_client = None
+# 不解码响应，用于存取 token id、向量等二进制值
+redis_binary_client = None
 
 
 def get_db() -> Generator[Session, None, None]:
@@ -63,10 +65,16 @@ async def init_db():
             print(f"⚠️ MongoDB 初始化失败: {e}")
 
     # 初始化 Redis
-    global redis_client
+    init_redis()
+
+
+def init_redis():
+    """初始化 Redis 客户端（分析工作进程启动时也会单独调用）。"""
+    global redis_client, redis_binary_client
     if redis is not None:
         try:
             redis_client = redis.from_url(REDIS_URL, decode_responses=True)
+            redis_binary_client = redis.from_url(REDIS_URL)
             # 轻触发一次连接
             try:
                 redis_client.ping()
@@ -0,0 +1,67 @@
+"""
+用户事件列式存储：按用户物化的 parquet 文件 + DuckDB 向量化聚合（可选使用）
+事件文件 {EVENTS_DIR}/events_{user_id}.parquet，列：ts (TIMESTAMP), score (DOUBLE)
+"""
+import os
+import re
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# 可选依赖：DuckDB（未安装或无事件文件时返回 None，由调用方使用占位数据）
+try:
+    import duckdb  # type: ignore
+except Exception:
+    duckdb = None  # type: ignore
+
+EVENTS_DIR = os.getenv('EVENTS_DIR', 'data/events')
+HEATMAP_LABELS = ['00:00-06:00', '06:00-12:00', '12:00-18:00', '18:00-24:00']
+_USER_ID_RE = re.compile(r'[\w-]+')
+
+
+def _events_path(user_id: str) -> Optional[Path]:
+    if duckdb is None or not _USER_ID_RE.fullmatch(user_id):
+        return None
+    path = Path(EVENTS_DIR) / f'events_{user_id}.parquet'
+    return path if path.exists() else None
+
+
+def _query(user_id: str, sql: str) -> Optional[list]:
+    path = _events_path(user_id)
+    if path is None:
+        return None
+    try:
+        # 每次查询独立连接：默认连接不能被多个线程同时使用
+        with duckdb.connect() as con:
+            return con.read_parquet(str(path)).query('events', sql).fetchall()
+    except Exception as e:
+        print(f"⚠️ 事件聚合查询失败: {e}")
+        return None
+
+
+def emotion_trend(user_id: str, days: int) -> Optional[List[Dict]]:
+    """最近 days 天的每日平均情绪分。"""
+    rows = _query(user_id, f"""
+        SELECT CAST(date_trunc('day', ts) AS DATE) AS d, AVG(score) AS score
+        FROM events
+        WHERE ts > CAST(now() AS TIMESTAMP) - INTERVAL {int(days)} DAY
+        GROUP BY 1 ORDER BY 1
+    """)
+    if rows is None:
+        return None
+    return [{'date': d.isoformat(), 'score': round(score, 1)} for d, score in rows]
+
+
+def activity_heatmap(user_id: str, days: int) -> Optional[Dict[str, int]]:
+    """最近 days 天按 6 小时时段统计的活动次数。"""
+    rows = _query(user_id, f"""
+        SELECT CAST(hour(ts) // 6 AS INTEGER) AS bucket, COUNT(*) AS n
+        FROM events
+        WHERE ts > CAST(now() AS TIMESTAMP) - INTERVAL {int(days)} DAY
+        GROUP BY 1
+    """)
+    if rows is None:
+        return None
+    heatmap = dict.fromkeys(HEATMAP_LABELS, 0)
+    for bucket, n in rows:
+        heatmap[HEATMAP_LABELS[bucket]] = n
+    return heatmap
@@ -0,0 +1,69 @@
+"""
+异步微批处理：把短时间窗口内到达的单条请求合并为一个批次执行
+"""
+import asyncio
+from typing import Any, Callable, List, Optional
+
+
+class MicroBatcher:
+    """
+    调用方 await submit(item) 获取单条结果；后台任务每攒够 max_batch 条
+    或等待超过 max_wait_ms 即调用一次 batch_fn(items)，再按顺序分发结果。
+    batch_fn 为同步函数，在线程池中执行，不阻塞事件循环。
+    """
+
+    def __init__(self, batch_fn: Callable[[List[Any]], List[Any]], max_batch: int = 32, max_wait_ms: float = 8):
+        self.batch_fn = batch_fn
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def submit(self, item: Any) -> Any:
+        if self._task is None:
+            self.start()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((item, future))
+        return await future
+
+    def start(self) -> None:
+        self._queue = asyncio.Queue()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _collect(self) -> list:
+        loop = asyncio.get_running_loop()
+        pending = [await self._queue.get()]
+        deadline = loop.time() + self.max_wait
+        while len(pending) < self.max_batch:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                pending.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return pending
+
+    async def _run(self) -> None:
+        while True:
+            pending = await self._collect()
+            try:
+                results = await asyncio.to_thread(self.batch_fn, [item for item, _ in pending])
+            except Exception as e:
+                for _, future in pending:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            for (_, future), result in zip(pending, results):
+                if not future.done():
+                    future.set_result(result)
@@ -0,0 +1,243 @@
+"""
+分析结果缓存：进程内 TTL-LRU（L1）+ Redis（L2）
+"""
+import asyncio
+import json
+import re
+import hashlib
+import inspect
+import threading
+import time
+from collections import OrderedDict
+from datetime import date
+from functools import wraps
+from typing import Any, Callable, Optional
+
+from backend.models import database
+
+INVALIDATE_CHANNEL = 'teenmind:cache:invalidate'
+_GLOB_SPECIAL_RE = re.compile(r'([*?\[\]\\])')
+
+
+class LocalTTLCache:
+    """线程安全的进程内 LRU 缓存，条目超过 ttl 秒后失效。"""
+
+    def __init__(self, maxsize: int = 10_000, ttl: float = 60):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Any:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires, value = item
+            if expires < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete_prefix(self, prefix: str) -> None:
+        with self._lock:
+            for key in [k for k in self._data if k.startswith(prefix)]:
+                del self._data[key]
+
+
+class TieredCache:
+    """L1 命中直接返回；L1 未命中再查 Redis，命中后回填 L1。Redis 不可用时仅使用 L1。"""
+
+    def __init__(self, maxsize: int = 10_000, ttl: int = 60):
+        self.ttl = ttl
+        self.local = LocalTTLCache(maxsize, ttl)
+
+    def get(self, key: str) -> Any:
+        value = self.local.get(key)
+        if value is not None:
+            return value
+        client = database.redis_client
+        if client is None:
+            return None
+        try:
+            raw = client.get(key)
+        except Exception:
+            return None
+        if raw is None:
+            return None
+        value = json.loads(raw)
+        self.local.set(key, value)
+        return value
+
+    def set(self, key: str, value: Any) -> None:
+        self.local.set(key, value)
+        self._set_remote(key, value)
+
+    def _set_remote(self, key: str, value: Any) -> None:
+        client = database.redis_client
+        if client is None:
+            return
+        try:
+            client.setex(key, self.ttl, json.dumps(value, ensure_ascii=False, default=_json_default))
+        except Exception:
+            pass
+
+    async def aget(self, key: str) -> Any:
+        """供协程使用：L1 在事件循环内查询，Redis 的阻塞调用放到线程中。"""
+        value = self.local.get(key)
+        if value is not None or database.redis_client is None:
+            return value
+        return await asyncio.to_thread(self.get, key)
+
+    async def aset(self, key: str, value: Any) -> None:
+        self.local.set(key, value)
+        if database.redis_client is not None:
+            await asyncio.to_thread(self._set_remote, key, value)
+
+    def invalidate(self, prefix: str) -> None:
+        self.local.delete_prefix(prefix)
+        client = database.redis_client
+        if client is None:
+            return
+        try:
+            # 前缀按字面匹配：转义其中的 glob 元字符（如 user_id 为 "*" 时不能波及其他用户）
+            keys = list(client.scan_iter(match=_GLOB_SPECIAL_RE.sub(r'\\\1', prefix) + '*'))
+            if keys:
+                client.delete(*keys)
+        except Exception:
+            pass
+
+
+def _json_default(obj):
+    # numpy 标量（np.bool_、np.float32 等）
+    if hasattr(obj, 'item'):
+        return obj.item()
+    return str(obj)
+
+
+def content_digest(*parts: Any) -> str:
+    """对任意可 JSON 序列化的参数求短摘要，作为缓存键的内容部分。"""
+    payload = json.dumps(parts, ensure_ascii=False, sort_keys=True, default=_json_default)
+    return hashlib.blake2b(payload.encode(), digest_size=8).hexdigest()
+
+
+analysis_cache = TieredCache(maxsize=10_000, ttl=60)
+dashboard_cache = TieredCache(maxsize=10_000, ttl=60)
+# 按用户划分的缓存：(缓存, 键前缀模板)，用户数据变化时统一失效
+_USER_SCOPED = [(analysis_cache, 'analysis:{}:'), (dashboard_cache, 'dash:{}:')]
+_listener_lock = threading.Lock()
+_listener = None
+
+
+def _evict_local(user_id: str) -> None:
+    for store, prefix in _USER_SCOPED:
+        store.local.delete_prefix(prefix.format(user_id))
+
+
+def _ensure_invalidation_listener() -> None:
+    """订阅失效频道，其他进程发布 user_id 时同步清除本进程 L1。"""
+    global _listener
+    client = database.redis_client
+    if _listener is not None or client is None:
+        return
+    with _listener_lock:
+        if _listener is not None:
+            return
+        try:
+            pubsub = client.pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(**{INVALIDATE_CHANNEL: lambda msg: _evict_local(msg['data'])})
+            _listener = pubsub.run_in_thread(sleep_time=1, daemon=True)
+        except Exception:
+            _listener = None
+
+
+def invalidate_user(user_id: str) -> None:
+    """用户数据变化时调用：清除该用户的分析与仪表盘缓存并通知其他进程。"""
+    for store, prefix in _USER_SCOPED:
+        store.invalidate(prefix.format(user_id))
+    client = database.redis_client
+    if client is None:
+        return
+    try:
+        client.publish(INVALIDATE_CHANNEL, user_id)
+    except Exception:
+        pass
+
+
+def cached_analysis(namespace: str, cache: Optional[TieredCache] = None) -> Callable:
+    """
+    缓存分析器方法的结果，键为 (user_id, 当天日期, 其余参数摘要)。
+    被装饰的方法必须有 user_id 参数。
+    """
+    def decorator(func: Callable) -> Callable:
+        sig = inspect.signature(func)
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            store = cache or analysis_cache
+            _ensure_invalidation_listener()
+            bound = sig.bind(*args, **kwargs)
+            bound.apply_defaults()
+            params = dict(bound.arguments)
+            params.pop('self', None)
+            user_id = params.pop('user_id')
+            key = f"analysis:{user_id}:{namespace}:{date.today().isoformat()}:{content_digest(params)}"
+            result = store.get(key)
+            if result is not None:
+                return result
+            result = func(*args, **kwargs)
+            store.set(key, result)
+            return result
+        return wrapper
+    return decorator
+
+
+def cached(prefix: str, key: Callable[..., str], ttl: int = 3600, hit_flag: Optional[str] = None,
+           cache: Optional[TieredCache] = None) -> Callable:
+    """
+    通用结果缓存装饰器（同步或异步函数均可），键为 prefix + key(*args, **kwargs)。
+    hit_flag 非空时，在返回的 dict 中写入该字段标记是否命中缓存；
+    cache 为空时新建一个 TTL 为 ttl 的独立缓存。
+    """
+    store = cache or TieredCache(ttl=ttl)
+
+    def mark(result, hit: bool):
+        return {**result, hit_flag: hit} if hit_flag and isinstance(result, dict) else result
+
+    def decorator(func: Callable) -> Callable:
+        if inspect.iscoroutinefunction(func):
+            @wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                if _listener is None and database.redis_client is not None:
+                    await asyncio.to_thread(_ensure_invalidation_listener)
+                cache_key = prefix + key(*args, **kwargs)
+                result = await store.aget(cache_key)
+                if result is not None:
+                    return mark(result, True)
+                result = await func(*args, **kwargs)
+                await store.aset(cache_key, result)
+                return mark(result, False)
+            async_wrapper.cache = store
+            return async_wrapper
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            _ensure_invalidation_listener()
+            cache_key = prefix + key(*args, **kwargs)
+            result = store.get(cache_key)
+            if result is not None:
+                return mark(result, True)
+            result = func(*args, **kwargs)
+            store.set(cache_key, result)
+            return mark(result, False)
+        wrapper.cache = store
+        return wrapper
+    return decorator
@@ -1,13 +1,26 @@
 from typing import List, Dict
+import numpy as np
+# 必需依赖：桶编号须在所有部署中一致，不能随是否安装而切换哈希算法
+import xxhash
+
+def _stable_hash64(value: str) -> int:
+    return xxhash.xxh64_intdigest(value.encode())
+
+def hash_buckets(values: List[str], buckets: int = 10000) -> np.ndarray:
+    """把字符串映射到 [0, buckets) 的桶编号；与内置 hash() 不同，跨进程结果一致。"""
+    hashes = np.fromiter((_stable_hash64(v) for v in values), dtype=np.uint64, count=len(values))
+    return hashes % np.uint64(buckets)
 
 def clean_texts(texts: List[str]) -> List[str]:
-    return [t.strip() for t in texts if t and t.strip()]
+    # 每条文本只 strip 一次
+    return [s for s in (t.strip() for t in texts if t) if s]
 
 def normalize_scores(items: List[Dict], key: str) -> List[Dict]:
     if not items:
         return items
-    vals = [abs(float(i.get(key, 0))) for i in items]
-    m = max(vals) or 1
-    for i in items:
-        i[key] = float(i.get(key, 0)) / m
+    arr = np.fromiter((float(i.get(key, 0)) for i in items), dtype=np.float64, count=len(items))
+    m = np.abs(arr).max() or 1.0
+    arr /= m
+    for i, v in zip(items, arr.tolist()):
+        i[key] = v
     return items
@@ -1,7 +1,17 @@
-import hashlib
+import os
+from typing import Optional
+
+from argon2 import PasswordHasher
+
+_password_hasher = PasswordHasher()
+
+def cpu_share(cores: Optional[int] = None) -> int:
+    """每个 API worker 分到的核数：总核数按 API_WORKERS 平分，至少为 1。"""
+    total = cores or os.cpu_count() or 1
+    return max(1, total // max(1, int(os.getenv('API_WORKERS', 1))))
 
 def hash_password(password: str) -> str:
-    return hashlib.sha256(password.encode()).hexdigest()
+    return _password_hasher.hash(password)
 
 def mask_email(email: str) -> str:
     try:
@@ -1,5 +1,9 @@
+import hashlib
+
 def anonymize_user_id(user_id: str) -> str:
-    return f"anon_{hash(user_id) & 0xffff}"
+    # blake2b 跨进程稳定（内置 hash() 每个进程加盐不同）
+    digest = hashlib.blake2b(user_id.encode(), digest_size=2).digest()
+    return f"anon_{int.from_bytes(digest, 'big')}"
 
 def remove_pii(text: str) -> str:
     # 极简占位：实际可加入手机号/邮箱/地址等识别
@@ -0,0 +1,77 @@
+"""
+CPU 密集型分析器的进程池：工作进程启动时各自构建一次分析器，计算不受主进程 GIL 限制
+"""
+import asyncio
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Any, Dict, Optional
+
+from backend.utils.helpers import cpu_share
+
+# 每个 API worker 的分析进程数，默认取本 worker 分到核数的一半；0 表示不启用进程池，退回线程池执行
+ANALYSIS_WORKERS = int(os.getenv('ANALYSIS_WORKERS', cpu_share() // 2))
+
+# 工作进程内的分析器实例，键为类名
+_worker_analyzers: Dict[str, Any] = {}
+
+
+def _init_worker() -> None:
+    from backend.models.database import init_redis
+    from backend.analyzer.music_psychology import MusicPsychologyAnalyzer
+    from backend.analyzer.anomaly_detect import AnomalyDetector
+    from backend.analyzer.resonance_network import ResonanceNetworkAnalyzer
+    # 结果缓存的 L2 与失效通知依赖 Redis
+    init_redis()
+    analyzers = (MusicPsychologyAnalyzer(), AnomalyDetector(), ResonanceNetworkAnalyzer())
+    warmup_analyzers(*analyzers)
+    for analyzer in analyzers:
+        _worker_analyzers[type(analyzer).__name__] = analyzer
+
+
+def warmup_analyzers(music_analyzer: Any, anomaly_detector: Any, resonance_analyzer: Any) -> None:
+    """绕过结果缓存各跑一次极小的输入，提前完成 numba JIT 编译等一次性开销。"""
+    type(music_analyzer).analyze.__wrapped__(music_analyzer, '__warmup__', ['1'], ['2025-01-01T23:00:00'])
+    type(anomaly_detector).detect.__wrapped__(anomaly_detector, '__warmup__', 7)
+    type(resonance_analyzer).analyze.__wrapped__(resonance_analyzer, '__warmup__', ['1'])
+
+
+def _ping() -> int:
+    time.sleep(0.05)
+    return os.getpid()
+
+
+def _call(name: str, method: str, kwargs: Dict[str, Any]) -> Any:
+    return getattr(_worker_analyzers[name], method)(**kwargs)
+
+
+def create_pool(max_workers: int = ANALYSIS_WORKERS) -> Optional[ProcessPoolExecutor]:
+    if max_workers <= 0:
+        return None
+    # spawn：主进程已有 torch/Redis 等后台线程，fork 不安全
+    return ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context('spawn'),
+                               initializer=_init_worker)
+
+
+async def start_pool(pool: ProcessPoolExecutor, workers: int = ANALYSIS_WORKERS, timeout: float = 120) -> None:
+    """
+    启动时拉起全部工作进程并等待其完成初始化（含预热），避免首个请求承担进程启动与 JIT 编译。
+    工作进程只有在初始化完成后才会领取任务，因此收到 workers 个不同 pid 的回应即表示全部就绪。
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    ready = set()
+    while len(ready) < workers and loop.time() < deadline:
+        ready.update(await asyncio.gather(*(loop.run_in_executor(pool, _ping) for _ in range(workers))))
+    if len(ready) < workers:
+        print(f"⚠️ 分析进程池仅 {len(ready)}/{workers} 个进程在启动期内就绪")
+
+
+async def run_analysis(pool: Optional[ProcessPoolExecutor], analyzer: Any, method: str, **kwargs) -> Any:
+    """在进程池中执行同类分析器的 method；未启用进程池时用本进程实例在线程池中执行。"""
+    if pool is None:
+        return await asyncio.to_thread(getattr(analyzer, method), **kwargs)
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(pool, partial(_call, type(analyzer).__name__, method, kwargs))